@@ -0,0 +1,70 @@
+#Helpers shared by the domain checking scripts
+import shelve
+import string
+import itertools
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from cachetools import TLRUCache
+
+try:
+    # libuv-based event loop, far less overhead per socket poll than asyncio's default
+    from uvloop import run as run_event_loop
+except ImportError:
+    # uvloop isn't available (e.g. on Windows), the default event loop works too
+    from asyncio import run as run_event_loop
+
+# Where results are kept between runs
+CACHE_DIR = Path.home() / ".cache" / "domain_check"
+# cachetools caches aren't thread-safe, and Streamlit runs every session in its
+# own thread against the same process-wide caches. Hold this around every
+# read/write of a shared cache and around loading/saving one.
+CACHE_LOCK = threading.Lock()
+
+def generate_names(length):
+    """
+    All 'length'-letter names (a–z), in alphabetical order, as one |S<length> array.
+    Built with a vectorized Cartesian product instead of one str.join per name.
+    """
+    letters = np.frombuffer(string.ascii_lowercase.encode(), dtype="S1")
+    grid = np.meshgrid(*[letters] * length, indexing="ij")
+    # Lay the letters of each name out next to each other, then view every
+    # 'length' bytes as one fixed-width string
+    return np.stack(grid, axis=-1).reshape(-1).view(f"S{length}")
+
+def iter_names(length, block_length=3):
+    """
+    Lazily yield all 'length'-letter names in alphabetical order, in blocks of
+    at most 26**block_length, so memory stays bounded however long names get.
+    """
+    suffixes = generate_names(min(length, block_length))
+    for prefix in itertools.product(string.ascii_lowercase, repeat=max(0, length - block_length)):
+        yield np.char.add("".join(prefix).encode(), suffixes)
+
+def new_expiring_cache(maxsize=100_000) -> TLRUCache:
+    """
+    Cache of (result, expires_at) tuples, each entry expiring at its own
+    expires_at (wall-clock time, so it stays meaningful across runs).
+    """
+    return TLRUCache(maxsize=maxsize, ttu=lambda _key, value, _now: value[1], timer=time.time)
+
+def load_expiring_cache(cache: TLRUCache, path: Path):
+    """
+    Fill 'cache' with the still-valid entries stored at 'path'.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    with CACHE_LOCK, shelve.open(str(path)) as db:
+        for key, value in db.items():
+            if value[1] > now:
+                cache[key] = value
+
+def save_expiring_cache(cache: TLRUCache, path: Path):
+    """
+    Write 'cache' to 'path', dropping expired entries.
+    """
+    with CACHE_LOCK:
+        cache.expire()
+        with shelve.open(str(path), flag="n") as db:
+            db.update(cache.items())
@@ -1,36 +1,96 @@
 #Simple domain checking tool - to get the shortest domains available
-import dns.resolver
-import dns.exception
-import string
-import itertools
-
-chars = string.ascii_lowercase # 'abcdefghijklmnopqrstuvwxyz'
-# Generate all possible combinations of 1-2 characters
-domain_names = []
+import aiodns
+import asyncio
+import time
+import numpy as np
+from common import (
+    CACHE_DIR, generate_names, load_expiring_cache, new_expiring_cache,
+    run_event_loop, save_expiring_cache
+)
+
 #Generate 1-2 characters domain names
-for i in range(1, 3):
-    for comb in itertools.product(chars, repeat=i):
-        domain_names.append(''.join(comb))
+domain_names = np.concatenate([generate_names(i) for i in range(1, 3)])
 #All possibilities generated
 
-def is_domain_available(domain):
+# Results are cached per domain for as long as DNS says they are valid,
+# capped at MAX_TTL seconds, and kept on disk between runs.
+CACHE_FILE = CACHE_DIR / "dns"
+MAX_TTL = 3600
+# Used when an answer carries no TTL we can see (NODATA, or no SOA for the TLD).
+# Errors (timeouts, SERVFAIL, ...) aren't answers and are never cached.
+DEFAULT_TTL = 300
+# Max number of DNS queries in flight, so we don't overrun the recursor
+CONCURRENCY = 128
+
+# Values are (available, expires_at) tuples
+_cache = new_expiring_cache()
+
+async def negative_ttl(resolver, tld):
+    """
+    How long an NXDOMAIN under 'tld' stays valid: the SOA minimum of the TLD zone (RFC 2308).
+    """
+    try:
+        soa = await resolver.query(tld, 'SOA')
+        return min(soa.ttl, soa.minttl)
+    except aiodns.error.DNSError:
+        return DEFAULT_TTL
+
+async def is_domain_available(resolver, domain, nxdomain_ttl):
     """
     Check domain by attempting to resolve DNS A record.
     If we get NXDOMAIN, likely it's not registered.
     This is not guaranteed for all TLDs, but a quick check.
     """
+    cached = _cache.get(domain)
+    if cached is not None:
+        return cached[0]
+
     try:
-        answers = dns.resolver.resolve(domain, 'A')
+        answers = await resolver.query(domain, 'A')
         # If it resolves successfully, it's likely registered:
-        return False
-    except dns.exception.DNSException:
-        # In case of NXDOMAIN or any error, we assume it's not resolved
-        return True
+        available, ttl = False, min(a.ttl for a in answers)
+    except aiodns.error.DNSError as e:
+        if e.args[0] == aiodns.error.ARES_ENOTFOUND:
+            # NXDOMAIN
+            available, ttl = True, nxdomain_ttl
+        elif e.args[0] == aiodns.error.ARES_ENODATA:
+            # The name exists, it just has no A record => registered
+            available, ttl = False, DEFAULT_TTL
+        else:
+            # In case of any other error, we assume it's not resolved,
+            # but don't remember that past this run
+            return True
+
+    _cache[domain] = (available, time.time() + min(ttl, MAX_TTL))
+    return available
+
+async def main():
+    resolver = aiodns.DNSResolver(nameservers=['1.1.1.1', '8.8.8.8'], timeout=2, tries=1)
+    sem = asyncio.Semaphore(CONCURRENCY)
+    # NXDOMAIN TTL per TLD, looked up once each
+    nxdomain_ttls = await asyncio.gather(*(negative_ttl(resolver, t) for t in tlds))
+
+    async def check(domain, nxdomain_ttl):
+        async with sem:
+            return await is_domain_available(resolver, domain, nxdomain_ttl)
+
+    # All names under all TLDs in one gather, instead of one TLD after another.
+    # Flattened row by row, so domain i is under tlds[i % len(tlds)]
+    all_domains = full_domains.astype(str).ravel().tolist()
+    # DNS errors are handled in is_domain_available, anything else is a bug and should surface
+    results = await asyncio.gather(
+        *(check(d, nxdomain_ttls[i % len(tlds)]) for i, d in enumerate(all_domains))
+    )
+    for full_domain, available in zip(all_domains, results):
+        if available:
+            print(f"Potentially available: {full_domain}")
 
 # Now let's test some short domains:
 tlds = ["io", "com", "ai", "de", "me", "app"]  # etc.
-for d in domain_names:  # e.g., 'a', 'b', 'aa', 'ab' ...
-    for t in tlds:
-        full_domain = f"{d}.{t}"
-        if is_domain_available(full_domain):
-            print(f"Potentially available: {full_domain}")
+# Every name under every TLD, as one (names x tlds) array of fixed-width bytes
+full_domains = np.char.add(np.char.add(domain_names[:, None], b"."), np.array(tlds, dtype="S"))
+load_expiring_cache(_cache, CACHE_FILE)
+try:
+    run_event_loop(main())
+finally:
+    save_expiring_cache(_cache, CACHE_FILE)
@@ -1,9 +1,26 @@
+import re
 import streamlit as st
 import whois
-import string
-import itertools
-import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from common import iter_names
+
+# WHOIS lookups are blocking network calls, so they run in a thread pool
+WHOIS_MAX_WORKERS = 32
+# Registries known to throttle WHOIS hard get fewer parallel lookups
+WHOIS_MAX_WORKERS_BY_TLD = {
+    "de": 4,
+}
+# Refresh the progress UI at most every N results / every N seconds
+UI_UPDATE_EVERY = 64
+UI_UPDATE_INTERVAL = 0.1
+
+# Phrases WHOIS servers use for unregistered domains, compiled into one
+# pattern so each response is scanned once instead of once per phrase
+NOT_FOUND = re.compile(
+    r"no match|not found|no data found|available for registration|status:\s*free",
+    re.IGNORECASE
+)
 
 def check_domain_whois(domain):
     """
@@ -16,10 +33,9 @@ def check_domain_whois(domain):
     """
     try:
         w = whois.whois(domain)
-        raw_text = (w.text or "").lower()
 
         # Look for "not found" patterns in the raw WHOIS text:
-        if "no match" in raw_text or "not found" in raw_text or "no data found" in raw_text:
+        if NOT_FOUND.search(w.text or ""):
             return True  # "Likely available"
 
         # If python-whois doesn't parse domain_name, treat it as available:
@@ -55,66 +71,67 @@ def main():
     domain_length = st.sidebar.number_input(
         "Number of characters:",
         min_value=1,
-        max_value=10,
+        max_value=6,
         value=2
     )
+    if domain_length >= 4:
+        st.sidebar.warning(f"That's {26 ** domain_length:,} WHOIS lookups, checking them takes a long time.")
 
     # "Check Domains" button
     if st.sidebar.button("Check Domains"):
         st.subheader(f"Checking all {domain_length}-char domains ending with .{tld}")
 
-        # Generate all combos of given length (letters only)
-        chars = string.ascii_lowercase
-        possible_domains = [
-            "".join(c) for c in itertools.product(chars, repeat=domain_length)
-        ]
-        total_count = len(possible_domains)
+        # All combos of given length (letters only) are generated block by block
+        total_count = 26 ** domain_length
 
         # Progress bar + status display
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        results = []
-        for i, name in enumerate(possible_domains):
-            full_domain = f"{name}.{tld}"
-            
-            # Update status
-            status_text.info(f"Currently checking: **{full_domain}**")
-
-            # WHOIS check
-            available = check_domain_whois(full_domain)
-            results.append({
-                "Domain": full_domain,
-                "Available": available
-            })
-
-            # Update progress bar
-            progress_value = (i + 1) / total_count
-            progress_bar.progress(progress_value)
-
-            # Optional small pause to avoid rate-limiting
-            # time.sleep(0.2)
-
-        # Filter for available domains only
-        df = pd.DataFrame(results)
-        df_available = df[df["Available"] == True].copy()
-
-        # Create a link column (markdown format). Use https:// to ensure clickable
-        df_available["Domain"] = df_available["Domain"].apply(
-            lambda d: f"[{d}](https://{d})"
-        )
-        # Create a "Status" column with green text + checkmark
-        df_available["Status"] = "✅ **:green[Verified]**"
-
-        # Drop the "Available" column, we only want the Domain and Status
-        df_available = df_available[["Domain", "Status"]]
-
-        # Display the final table as HTML to preserve clickable links
+        available_domains = []
+        max_workers = WHOIS_MAX_WORKERS_BY_TLD.get(tld.lower(), WHOIS_MAX_WORKERS)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            i = 0
+            last_update = time.monotonic()
+            # Only one block of lookups is pending at a time
+            for names in iter_names(domain_length):
+                futures = {
+                    executor.submit(check_domain_whois, full_domain): full_domain
+                    for full_domain in (f"{name}.{tld}" for name in names.astype(str).tolist())
+                }
+                for future in as_completed(futures):
+                    i += 1
+                    # Only keep the domains we're going to show
+                    if future.result():
+                        available_domains.append(futures[future])
+
+                    # Update status + progress bar, batched: every UI call is a
+                    # websocket round-trip to the browser
+                    now = time.monotonic()
+                    if i % UI_UPDATE_EVERY == 0 or now - last_update > UI_UPDATE_INTERVAL or i == total_count:
+                        last_update = now
+                        status_text.info(f"Checked {i}/{total_count}, found {len(available_domains)} available")
+                        progress_bar.progress(i / total_count)
+        finally:
+            # Don't wait for the queued lookups if Streamlit stops or reruns the
+            # script mid-block (it raises inside the loop), just drop them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Lookups finish out of order, list them alphabetically again
+        available_domains.sort()
+
+        # Display the final table as markdown, with a clickable https:// link
+        # and a green checkmark status per domain
         st.write("### Available Domains:")
-        if df_available.empty:
+        if not available_domains:
             st.write("No available domains found.")
         else:
-            st.markdown(df_available.to_html(escape=False, index=False), unsafe_allow_html=True)
+            st.markdown("\n".join([
+                "| Domain | Status |",
+                "| --- | --- |",
+                *(f"| [{d}](https://{d}) | ✅ **:green[Verified]** |" for d in available_domains)
+            ]))
 
         # Final note
         st.write("""
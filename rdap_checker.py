@@ -1,10 +1,17 @@
+from types import MappingProxyType
+from typing import Optional
+
 import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Attempted RDAP endpoints for certain TLDs
 # NOTE: Some of these may or may not exist in reality.
 # For official data, check IANA’s RDAP bootstrap registry:
 # https://www.iana.org/assignments/rdap-bootstrap/rdap-bootstrap.xhtml
-RDAP_SERVERS = {
+# Read-only, it's a fixed table of known endpoints
+RDAP_SERVERS = MappingProxyType({
     # .io (ccTLD for British Indian Ocean Territory)
     # Officially, it might not have a fully public RDAP. This is a guess.
     "io": "https://rdap.nic.io/domain/",
@@ -23,50 +30,70 @@ RDAP_SERVERS = {
 
     # .dev (gTLD by Google)
     "dev": "https://rdap.nic.dev/domain/"
-}
+})
+
+# One shared session, so repeated lookups against the same rdap.nic.<tld> host
+# reuse the TCP/TLS connection instead of reconnecting for every domain.
+SESSION = requests.Session()
+SESSION.headers["Connection"] = "keep-alive"
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 503]),
+))
+
+# Confirmed results (AVAILABLE/TAKEN) are kept for an hour
+_cache = TTLCache(maxsize=100_000, ttl=3600)
 
-def check_domain_rdap(domain: str) -> bool:
+def check_domain_rdap(domain: str) -> Optional[bool]:
     """
     Checks availability of 'domain' via the TLD's RDAP endpoint.
 
     Returns True if domain is AVAILABLE (i.e., not found in RDAP),
-    Returns False if domain is TAKEN or if the TLD doesn't have a known working RDAP.
+    Returns False if domain is TAKEN,
+    Returns None if it's UNKNOWN (no known RDAP server for the TLD, or the lookup
+    still failed after SESSION's retries).
     """
 
-    parts = domain.strip().split(".")
-    if len(parts) < 2:
+    # Extract TLD (last part), no need to split out every label
+    _, sep, tld = domain.strip().rpartition(".")
+    if not sep:
         raise ValueError(f"Invalid domain format: {domain}")
-
-    # Extract TLD (last part)
-    tld = parts[-1].lower()
+    tld = tld.lower()
 
     # Look up the RDAP base URL
     if tld not in RDAP_SERVERS:
         print(f"No known RDAP server for TLD: {tld}")
-        return False  # Or raise an exception or revert to another method
+        return None  # Or raise an exception or revert to another method
 
     base_url = RDAP_SERVERS[tld]
     # Construct the full RDAP URL
     rdap_url = base_url + domain  # e.g. https://rdap.nic.io/domain/example.io
 
+    cache_key = (domain, tld)
+    if cache_key in _cache:
+        return _cache[cache_key]
+
     try:
-        response = requests.get(rdap_url, timeout=10)
+        response = SESSION.get(rdap_url, timeout=10)
         # RDAP convention: 404 = not found -> domain is likely AVAILABLE
         if response.status_code == 404:
+            _cache[cache_key] = True
             return True
         elif response.status_code == 200:
             # 200 = domain found in registry = TAKEN
+            _cache[cache_key] = False
             return False
         else:
-            # Could be 403, 429 (rate limit), 503, etc.
-            # We'll assume we can't confirm it's unregistered, so call it TAKEN (False).
+            # Could be 403, 500, etc.
+            # We can't confirm either way, so call it UNKNOWN (None) rather than TAKEN.
             print(f"[WARN] Unexpected HTTP {response.status_code} for {domain}")
-            return False
+            return None
 
     except requests.exceptions.RequestException as e:
-        # Network error, timeout, etc. 
+        # Network error, timeout, or still 429/503 after retrying
         print(f"[ERROR] Request to {rdap_url} failed: {e}")
-        return False
+        return None
 
 if __name__ == "__main__":
     # Test some domains on the TLDs we (hypothetically) support:
@@ -85,5 +112,5 @@ if __name__ == "__main__":
     print("=== RDAP Availability Checks ===")
     for d in test_domains:
         is_avail = check_domain_rdap(d)
-        status_str = "AVAILABLE" if is_avail else "TAKEN"
+        status_str = "UNKNOWN" if is_avail is None else "AVAILABLE" if is_avail else "TAKEN"
         print(f"{d} → {status_str}")
@@ -1,55 +1,377 @@
 #streamlit run rdap_streamlit.py
 
 
+import asyncio
+import importlib.util
+import os
+import pickle
 import streamlit as st
-import requests
-import string
-import itertools
-import pandas as pd
+import httpx
+import orjson
+import aiodns
+from asyncio_throttle import Throttler
+import time
+import numpy as np
+from types import MappingProxyType
+from typing import Optional
+from cachetools import TLRUCache
+from pybloom_live import ScalableBloomFilter
+from tenacity import (
+    AsyncRetrying, RetryCallState, RetryError, retry_if_exception_type,
+    retry_if_result, stop_after_attempt, wait_random_exponential
+)
+from common import (
+    CACHE_DIR, CACHE_LOCK, iter_names, load_expiring_cache, new_expiring_cache,
+    run_event_loop, save_expiring_cache
+)
 
-# Known RDAP endpoints for certain TLDs (may or may not actually work for .io/.ai)
-RDAP_SERVERS = {
+# Known RDAP endpoints for certain TLDs (may or may not actually work for .io/.ai), read-only
+RDAP_SERVERS = MappingProxyType({
     "io": "https://rdap.nic.io/domain/",
     "ai": "https://rdap.nic.ai/domain/",
     "app": "https://rdap.nic.app/domain/",
     "xyz": "https://rdap.nic.xyz/domain/",
     "dev": "https://rdap.nic.dev/domain/"
-}
+})
 
-def check_domain_rdap(domain: str) -> bool:
+# Max number of RDAP requests in flight at once
+CONCURRENCY = 64
+# Max number of domains being screened via DNS at once (= number of consumers)
+DNS_CONCURRENCY = 256
+# Max number of generated domains waiting to be checked
+QUEUE_SIZE = 10_000
+# Refresh the progress UI at most every N results / every N seconds
+UI_UPDATE_EVERY = 64
+UI_UPDATE_INTERVAL = 0.1
+RDAP_TIMEOUT = 10
+# RDAP servers behind CDNs speak HTTP/2, so a few connections can multiplex
+# many concurrent lookups instead of opening one connection per request
+RDAP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# httpx needs the h2 package (httpx[http2]) for that, otherwise stick to HTTP/1.1
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Requests per minute allowed per RDAP host. ccTLD registries tend to be stricter,
+# and once they start answering 403/429 every further result would be wrong.
+CCTLD_RATE = 10
+GTLD_RATE = 60
+
+class AdaptiveThrottler(Throttler):
+    """
+    Throttler that backs off when the server rate limits us and recovers slowly.
+
+    The rate is halved at most once per 'period': requests that were already
+    in flight when we got limited report the same 429 and must not cut it again.
+    After that, every successful response adds one request per 'period' back,
+    up to the rate we started with.
+    """
+    def __init__(self, rate_limit: int, period: float):
+        super().__init__(rate_limit=rate_limit, period=period)
+        self.max_rate = rate_limit
+        self._last_cut = float("-inf")
+
+    def slow_down(self):
+        now = time.monotonic()
+        if now - self._last_cut >= self.period:
+            self._last_cut = now
+            self.rate_limit = max(1, self.rate_limit // 2)
+
+    def speed_up(self):
+        if self.rate_limit < self.max_rate and time.monotonic() - self._last_cut >= self.period:
+            self.rate_limit += 1
+
+@st.cache_resource
+def get_throttlers() -> dict:
     """
-    Checks availability of 'domain' via the TLD's RDAP endpoint.
+    One throttler per TLD, shared across reruns and sessions: they all hit the
+    same RDAP hosts, so they have to share the same request budget.
+    """
+    return {
+        tld: AdaptiveThrottler(rate_limit=CCTLD_RATE if len(tld) == 2 else GTLD_RATE, period=60)
+        for tld in RDAP_SERVERS
+    }
+
+# Phrases registries put in 403/429 bodies when we query too fast
+RATE_LIMIT_MARKERS = ("number of allowed queries exceeded", "access is too fast")
+# Transient failures are retried up to MAX_ATTEMPTS times in total
+MAX_ATTEMPTS = 4
+RETRY_STATUSES = (429, 503)
+RETRY_MAX_WAIT = 30
+
+class RateLimitedError(Exception):
+    """
+    Raised when an RDAP server tells us we are querying it too fast.
+    'retry_after' is how long it asked us to wait, if it said so.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Confirmed RDAP results are cached for an hour and kept on disk between restarts
+CACHE_FILE = CACHE_DIR / "rdap"
+CACHE_TTL = 3600
+
+@st.cache_resource
+def get_rdap_cache() -> TLRUCache:
+    """
+    Process-wide cache of (available, expires_at) per domain, shared across reruns
+    and sessions, so only touch it while holding CACHE_LOCK.
+    Starts out with the still-valid entries from CACHE_FILE.
+    """
+    cache = new_expiring_cache()
+    load_expiring_cache(cache, CACHE_FILE)
+    return cache
+
+# Short domains that are registered practically never become free again, so
+# known-TAKEN domains are remembered permanently (and compactly) in a Bloom filter
+BLOOM_FILE = CACHE_DIR / "taken.bloom"
+
+@st.cache_resource
+def get_taken_bloom() -> ScalableBloomFilter:
+    """
+    Process-wide Bloom filter of domains known to be TAKEN, loaded from BLOOM_FILE.
+    Shared across sessions like the RDAP cache, so only touch it while holding CACHE_LOCK.
+    """
+    try:
+        with CACHE_LOCK, open(BLOOM_FILE, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return ScalableBloomFilter(initial_capacity=100_000, error_rate=0.001)
+
+def save_taken_bloom(bloom: ScalableBloomFilter):
+    """
+    Write 'bloom' back to BLOOM_FILE.
+    Dumped to a temporary file first and swapped in, so a crash mid-write
+    can't leave a truncated pickle behind.
+    """
+    BLOOM_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = BLOOM_FILE.with_suffix(".tmp")
+    with CACHE_LOCK:
+        with open(tmp_file, "wb") as f:
+            pickle.dump(bloom, f)
+        os.replace(tmp_file, BLOOM_FILE)
+
+async def check_domain_rdap(client: httpx.AsyncClient, domain: str, base_url: str,
+                            throttler: AdaptiveThrottler, cache: TLRUCache,
+                            taken: ScalableBloomFilter) -> Optional[bool]:
+    """
+    Checks availability of 'domain' via the RDAP endpoint 'base_url' of its TLD,
+    rate limited by that host's 'throttler'. The caller resolves both once per TLD,
+    so nothing needs to be parsed or looked up per domain here.
+    Confirmed results are stored in 'cache' (the caller looks it up before calling this),
+    TAKEN ones are also added to 'taken'.
+    Rate limits, 503s and network errors are retried with jittered exponential backoff.
 
     Returns True if domain is AVAILABLE (i.e., not found in RDAP => HTTP 404),
-    Returns False if domain is TAKEN (HTTP 200) or if some other status is encountered.
+    Returns False if domain is TAKEN (HTTP 200),
+    Returns None if it's UNKNOWN (some other status, or retries ran out).
     """
-    parts = domain.strip().split(".")
-    if len(parts) < 2:
-        return False  # invalid domain
+    rdap_url = base_url + domain  # e.g., https://rdap.nic.io/domain/mydomain.io
 
-    tld = parts[-1].lower()
+    try:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(MAX_ATTEMPTS),
+            wait=_retry_wait,
+            retry=(retry_if_exception_type((httpx.TransportError, RateLimitedError))
+                   | retry_if_result(lambda r: r.status_code in RETRY_STATUSES))
+        ):
+            with attempt:
+                response = await _fetch_rdap(client, throttler, rdap_url)
+            # Let retry_if_result see the response
+            if not attempt.retry_state.outcome.failed:
+                attempt.retry_state.set_result(response)
+    except (RetryError, httpx.HTTPError):
+        # Still failing after all retries => UNKNOWN
+        return None
 
-    if tld not in RDAP_SERVERS:
-        # No known RDAP server for this TLD
+    if response.status_code == 404:
+        # "Not found" typically means AVAILABLE
+        with CACHE_LOCK:
+            cache[domain] = (True, time.time() + CACHE_TTL)
+        return True
+    elif response.status_code == 200:
+        # 200 => Registered => TAKEN
+        with CACHE_LOCK:
+            cache[domain] = (False, time.time() + CACHE_TTL)
+            taken.add(domain)
         return False
+    else:
+        # Unexpected status code => UNKNOWN
+        return None
 
-    base_url = RDAP_SERVERS[tld]
-    rdap_url = base_url + domain  # e.g., https://rdap.nic.io/domain/mydomain.io
+async def _fetch_rdap(client: httpx.AsyncClient, throttler: AdaptiveThrottler, rdap_url: str) -> httpx.Response:
+    """
+    GET 'rdap_url' within the host's rate limit.
+    Raises RateLimitedError (and slows the host down) if the server says we are going too fast,
+    lets the host speed back up on an answer.
+    """
+    async with throttler:
+        response = await client.get(rdap_url)
+    if response.status_code in (403, 429):
+        if response.status_code == 429 or _says_too_fast(response):
+            throttler.slow_down()
+            raise RateLimitedError(f"Rate limited by {response.url.host}", _retry_after(response))
+    elif response.status_code in (200, 404):
+        throttler.speed_up()
+    return response
 
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Seconds the server asked us to wait via Retry-After, if it said so.
+    """
     try:
-        response = requests.get(rdap_url, timeout=10)
-        if response.status_code == 404:
-            # "Not found" typically means AVAILABLE
-            return True
-        elif response.status_code == 200:
-            # 200 => Registered => TAKEN
-            return False
-        else:
-            # Unexpected status code => assume TAKEN or uncertain
-            return False
-    except requests.exceptions.RequestException:
-        # Network error or timeout => assume TAKEN or uncertain
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+_backoff = wait_random_exponential(multiplier=0.5, max=RETRY_MAX_WAIT)
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """
+    Wait as long as the server's Retry-After asks for, else back off exponentially with jitter.
+    """
+    outcome = retry_state.outcome
+    if outcome.failed:
+        retry_after = getattr(outcome.exception(), "retry_after", None)
+    else:
+        retry_after = _retry_after(outcome.result())
+    if retry_after is None:
+        return _backoff(retry_state)
+    return min(retry_after, RETRY_MAX_WAIT)
+
+def _json_strings(value):
+    """
+    Every string anywhere in parsed JSON 'value', however deeply nested.
+    """
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _json_strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _json_strings(v)
+
+def _says_too_fast(response: httpx.Response) -> bool:
+    """
+    True if the body of 'response' contains one of RATE_LIMIT_MARKERS.
+    RDAP error bodies are JSON, but registries put the message in different
+    places ('description', 'notices', ...), so every string in it is searched
+    (with escapes decoded). Bodies that aren't JSON are searched as raw text.
+    """
+    try:
+        texts = _json_strings(orjson.loads(response.content))
+    except orjson.JSONDecodeError:
+        texts = [response.text]
+    return any(m in t.lower() for t in texts for m in RATE_LIMIT_MARKERS)
+
+async def _has_dns_records(resolver: aiodns.DNSResolver, domain: str) -> bool:
+    """
+    True if 'domain' answers with an A or NS record, i.e. it is registered.
+    """
+    answers = await asyncio.gather(
+        _resolves(resolver, domain, "A"),
+        _resolves(resolver, domain, "NS")
+    )
+    return any(answers)
+
+async def _resolves(resolver: aiodns.DNSResolver, domain: str, record_type: str) -> bool:
+    """
+    True if 'domain' has a 'record_type' record. DNS errors (NXDOMAIN, no data,
+    timeouts, ...) just mean no answer, anything else is a bug and propagates.
+    """
+    try:
+        await resolver.query(domain, record_type)
+    except aiodns.error.DNSError:
         return False
+    return True
+
+async def produce(queue: asyncio.Queue, domain_length: int, tld: str, consumers: int):
+    """
+    Feed every 'domain_length'-char domain under 'tld' into 'queue',
+    followed by one None per consumer to tell it to stop.
+    """
+    suffix = f".{tld}".encode()
+    for names in iter_names(domain_length):
+        for dom in np.char.add(names, suffix).astype(str).tolist():
+            await queue.put(dom)
+    for _ in range(consumers):
+        await queue.put(None)
+
+async def consume(queue: asyncio.Queue, check, report):
+    """
+    Check domains from 'queue' until it hands us None, reporting each result.
+    """
+    while (dom := await queue.get()) is not None:
+        report(dom, await check(dom))
+
+async def run_all(domain_length, tld, progress_bar, status_info) -> tuple:
+    """
+    Check all 'domain_length'-char domains ending in .'tld'. A producer streams
+    the domains through a bounded queue to DNS_CONCURRENCY consumers, so memory
+    stays O(QUEUE_SIZE) no matter how many domains there are.
+
+    Per domain, known-TAKEN domains are skipped, then a cheap DNS screen drops
+    domains that have records, and only the rest are checked via RDAP over a
+    single HTTP/2 client. Progress is reported as results come in.
+
+    Returns the sorted AVAILABLE domains and the sorted UNKNOWN ones.
+    """
+    total_count = 26 ** domain_length
+    # Domains we already know are TAKEN from earlier runs are skipped
+    taken = get_taken_bloom()
+    cache = get_rdap_cache()
+    base_url = RDAP_SERVERS[tld]
+    throttler = get_throttlers()[tld]
+    resolver = aiodns.DNSResolver()
+    sem = asyncio.Semaphore(CONCURRENCY)
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    results_available = []
+    results_unknown = []
+    checked = 0
+    last_update = time.monotonic()
+
+    def report(dom, is_avail):
+        nonlocal checked, last_update
+        checked += 1
+        if is_avail:
+            results_available.append(dom)
+        elif is_avail is None:
+            results_unknown.append(dom)
+
+        # Every UI call is a websocket message, so only refresh every
+        # UI_UPDATE_EVERY items / UI_UPDATE_INTERVAL seconds, and at the end
+        now = time.monotonic()
+        if checked % UI_UPDATE_EVERY == 0 or now - last_update > UI_UPDATE_INTERVAL or checked == total_count:
+            last_update = now
+            status_info.text(f"Checked {checked}/{total_count}, found {len(results_available)} available")
+            progress_bar.progress(int(checked/total_count * 100))
+
+    async with httpx.AsyncClient(http2=HTTP2, limits=RDAP_LIMITS, timeout=RDAP_TIMEOUT) as client:
+        async def check(dom):
+            with CACHE_LOCK:
+                if dom in taken:
+                    return False
+                # Answered by RDAP recently, no need to screen it via DNS again
+                cached = cache.get(dom)
+            if cached is not None:
+                return cached[0]
+            # DNS records (NXDOMAIN and timeouts are left for RDAP to decide)
+            if await _has_dns_records(resolver, dom):
+                with CACHE_LOCK:
+                    taken.add(dom)
+                return False
+            async with sem:
+                return await check_domain_rdap(client, dom, base_url, throttler, cache, taken)
+
+        await asyncio.gather(
+            produce(queue, domain_length, tld, DNS_CONCURRENCY),
+            *(consume(queue, check, report) for _ in range(DNS_CONCURRENCY))
+        )
+
+    save_expiring_cache(cache, CACHE_FILE)
+    save_taken_bloom(taken)
+    return sorted(results_available), sorted(results_unknown)
 
 def main():
     st.title("RDAP Domain Availability Checker")
@@ -69,38 +391,34 @@ def main():
     domain_length = st.sidebar.slider(
         "Number of characters:",
         min_value=1,
-        max_value=5,
+        max_value=6,
         value=2,
         help="Generate all alphabetical combinations of this length (a–z)."
     )
+    if domain_length >= 5:
+        st.sidebar.warning(f"That's {26 ** domain_length:,} domains, checking them takes a long time.")
 
     if st.sidebar.button("Check Domains"):
         st.subheader(f"Checking all {domain_length}-char domains ending with .{chosen_tld}")
 
-        # Generate domains
-        letters = string.ascii_lowercase  # 'abcdefghijklmnopqrstuvwxyz'
-        combos = itertools.product(letters, repeat=domain_length)  # e.g. aa, ab, ...
-        possible_domains = ["".join(c) + "." + chosen_tld for c in combos]
-        total_count = len(possible_domains)
+        # Domains (e.g. aa.io, ab.io, ...) are generated as they're checked
+        total_count = 26 ** domain_length
 
         # Progress UI
         progress_bar = st.progress(0)
         status_info = st.empty()
 
-        results_available = []
-        for i, dom in enumerate(possible_domains):
-            status_info.text(f"Currently checking: {dom}")
-            is_avail = check_domain_rdap(dom)
-            if is_avail:
-                results_available.append(dom)
-            progress_bar.progress(int((i+1)/total_count * 100))
+        results_available, results_unknown = run_event_loop(run_all(domain_length, chosen_tld, progress_bar, status_info))
 
         status_info.text("Done.")
         st.write(f"**Found {len(results_available)} available domains** (out of {total_count}).")
 
         if results_available:
-            df = pd.DataFrame({"Available Domains": results_available})
-            st.dataframe(df, use_container_width=True)
+            st.dataframe({"Available Domains": results_available}, use_container_width=True)
+
+        if results_unknown:
+            st.write(f"**{len(results_unknown)} domains could not be checked** (rate limits, server or network errors).")
+            st.dataframe({"Unknown Domains": results_unknown}, use_container_width=True)
 
 if __name__ == "__main__":
     main()